@@ -1,6 +1,7 @@
 """define module level objects"""
 
 from .table import Calculated
+from .table import Result
 from .table import SpecialHandling
 from .table import Table
 from .adapter import Adapter
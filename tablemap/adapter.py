@@ -1,6 +1,10 @@
 """provide a layer between objects and a Table mapper
 """
 
+import asyncio
+import weakref
+
+from tablemap.table import Result
 from tablemap.table import Table
 
 
@@ -15,6 +19,15 @@ class Adapter(Table):
     object_factory = callable  # object_factory(item: dict) -> object
     object_serializer = callable  # object_serializer(item: object) -> dict
 
+    # if True, objects loaded with the same primary key are the same instance
+    identity_map = False
+    _identity_map = weakref.WeakValueDictionary()  # pk -> object; per subclass
+
+    def __init_subclass__(cls, **kwargs):
+        """give each subclass its own identity map"""
+        super().__init_subclass__(**kwargs)
+        cls._identity_map = weakref.WeakValueDictionary()
+
     @classmethod
     # pylint: disable=unused-argument
     async def before_save(cls, con, data: dict) -> dict:
@@ -27,14 +40,25 @@ class Adapter(Table):
         """modify data after load from database"""
         return data
 
+    @classmethod
+    async def after_load_many(cls, con, rows: list) -> list:
+        """modify a list of rows after load from database
+
+        by default, after_load is called for each row; override this to
+        handle all of the rows at once
+        """
+        return [await cls.after_load(con, row) for row in rows]
+
     @classmethod
     async def save(cls, con, data, raw=None):
+        if isinstance(data, list):
+            return await cls._save_list(con, data, raw)
         serial = cls.object_serializer(data)
         serial = await cls.before_save(con, serial)
-        if await super().save(con, serial, raw):
-            if cls.pk and cls.last_id:
-                setattr(data, cls.pk, cls.last_id)
-        return cls.row_count
+        if result := await super().save(con, serial, raw):
+            if cls.pk and result.last_id:
+                setattr(data, cls.pk, result.last_id)
+        return result
 
     @classmethod
     async def insert(cls, con, data, raw=None):
@@ -42,47 +66,151 @@ class Adapter(Table):
         if is_obj := not isinstance(item, dict):
             item = cls.object_serializer(item)
             item = await cls.before_save(con, item)
-        if await super().insert(con, item, raw):
-            if is_obj and cls.pk and cls.last_id:
-                setattr(data, cls.pk, cls.last_id)
-        return cls.row_count
+        if result := await super().insert(con, item, raw):
+            if is_obj and cls.pk and result.last_id:
+                setattr(data, cls.pk, result.last_id)
+        return result
+
+    @classmethod
+    async def save_many(cls, pool, data: list, raw=None) -> list:
+        """save each object concurrently, each on its own pooled cursor
+
+        the saves are independent transactions: one failure does not undo
+        the others. return a list of Result, one for each object
+        """
+
+        async def _save(item):
+            async with pool.acquire() as con:
+                return await cls.save(con, item, raw)
+
+        return list(await asyncio.gather(*map(_save, data)))
+
+    @classmethod
+    async def _save_list(cls, con, data: list, raw=None):
+        """save a list of objects
+
+        objects with a primary key are updated one at a time; the rest are
+        inserted with one statement for each distinct set of columns
+
+        the Result's last_ids are the primary keys of the inserted objects, in
+        the order they appear in data; last_query is the last statement run
+        """
+        await cls.setup(con)
+        serials = [
+            await cls.before_save(con, cls.object_serializer(item)) for item in data
+        ]
+        row_count, last_query, last_ids = 0, None, {}
+        groups = {}  # columns -> indexes of new objects with those columns
+        for i, serial in enumerate(serials):
+            if cls.pk in serial:
+                result = await super().update(con, serial, raw)
+                row_count, last_query = row_count + result, result.last_query
+            else:
+                columns = frozenset(k for k in serial if k in cls._field_set)
+                groups.setdefault(columns, []).append(i)
+        for new in groups.values():
+            result = await super().insert_many(con, [serials[i] for i in new], raw)
+            row_count, last_query = row_count + result, result.last_query
+            for i, pk in zip(new, result.last_ids or []):
+                setattr(data[i], cls.pk, pk)
+                last_ids[i] = pk
+        last_ids = [last_ids[i] for i in sorted(last_ids)] if groups else None
+        return cls._result(row_count, last_query, last_ids=last_ids)
+
+    @classmethod
+    async def insert_many(cls, con, rows, raw=None):
+        items = await cls._serialize_list(con, rows, raw)
+        if result := await super().insert_many(con, items, raw):
+            if cls.pk and result.last_ids:
+                for item, pk in zip(rows, result.last_ids):
+                    if isinstance(item, dict):
+                        continue
+                    if getattr(item, cls.pk, None) is None:
+                        setattr(item, cls.pk, pk)
+        return result
+
+    @classmethod
+    async def copy_in(cls, con, rows):
+        items = await cls._serialize_list(con, rows)
+        return await super().copy_in(con, items)
+
+    @classmethod
+    async def _serialize_list(cls, con, rows, raw=None) -> list:
+        """serialize each object in rows (dicts are passed through)
+
+        the rows' columns are checked before any before_save is called
+        """
+        await cls.setup(con)
+        items = [
+            item if isinstance(item, dict) else cls.object_serializer(item)
+            for item in rows
+        ]
+        if items:
+            cls._row_columns(items, raw)
+        return [
+            item if item is row else await cls.before_save(con, item)
+            for row, item in zip(rows, items)
+        ]
 
     @classmethod
     async def update(cls, con, data, raw=None):
         if not isinstance(data, dict):
             data = cls.object_serializer(data)
             data = await cls.before_save(con, data)
-        await super().update(con, data, raw)
+        return await super().update(con, data, raw)
 
     @classmethod
     async def load(cls, con, pk):
         if rs := await super().load(con, pk):
             rs = await cls.after_load(con, rs)
-            rs = cls.object_factory(rs)
+            rs = cls._hydrate(rs)
         return rs
 
     @classmethod
     async def query(cls, con, *args, limit=None, offset=None):
         rs = await super().query(con, *args, limit=limit, offset=offset)
 
-        async def _load(item: dict):
-            item = await cls.after_load(con, item)
-            return cls.object_factory(item)
-
         result = None
         if rs:
             if limit == 1:
-                result = await _load(rs)
+                result = cls._hydrate(await cls.after_load(con, rs))
             else:
-                result = [await _load(item) for item in rs]
+                rs = await cls.after_load_many(con, rs)
+                result = list(map(cls._hydrate, rs))
 
         return result
 
+    @classmethod
+    def _hydrate(cls, data: dict):
+        """build an object from a loaded row
+
+        if identity_map is True, an object already loaded with the same
+        primary key takes on the state of the new object and is returned
+        instead
+        """
+        obj = cls.object_factory(data)
+        if cls.identity_map and cls.pk and (pk := data.get(cls.pk)) is not None:
+            if (cached := cls._identity_map.get(pk)) is not None:
+                cached.__dict__.clear()
+                cached.__dict__.update(obj.__dict__)
+                return cached
+            cls._identity_map[pk] = obj
+        return obj
+
     @classmethod
     # pylint: disable=arguments-differ
-    async def delete(cls, con, condition=None, args=None, pk=None) -> int:
+    async def delete(cls, con, condition=None, args=None, pk=None) -> Result:
         await cls.setup(con)
+        condition, args = cls._validate_delete_args(condition, args, pk)
+        return await super().delete(con, condition, *args)
 
+    @classmethod
+    def _validate_delete_args(cls, condition=None, args=None, pk=None) -> tuple:
+        """check the arguments to delete
+
+        return (condition, args) for Table.delete; raise TypeError if the
+        arguments are not compatible with each other
+        """
         if args is None:
             args = []
         elif not isinstance(args, (list, tuple)):
@@ -93,28 +221,23 @@ class Adapter(Table):
                 raise TypeError("pk is not compatible with args")
             if condition:
                 raise TypeError("pk is not compatible with condition")
-            result = await super().delete(con, f"{con.quote(cls.pk)}=%s", pk)
-        elif condition and hasattr(condition, cls.pk):
-            if pk:
-                raise TypeError("object is not compatible with pk")
+            return cls._pk_condition, [pk]
+        if condition and hasattr(condition, cls.pk):
             if args:
                 raise TypeError("object is not compatible with args")
-            pk = getattr(condition, cls.pk)
-            result = await super().delete(con, f"{con.quote(cls.pk)}=%s", pk)
-        elif condition:
+            return cls._pk_condition, [getattr(condition, cls.pk)]
+        if condition:
             if not isinstance(condition, str):
                 raise TypeError("expecting condition to be a str")
-            result = await super().delete(con, condition, *args)
-        else:
-            raise TypeError("no arguments specified")
-
-        return result
+            return condition, args
+        raise TypeError("no arguments specified")
 
     @classmethod
     async def count(cls, con, where_clause: str = "1=1") -> int:
         """Count rows that would be returned by "where_clause"."""
+        await cls.setup(con)
         return await con.select_one(
-            f"SELECT COUNT(*) FROM {con.quote(cls.table_name)}" f" WHERE {where_clause}"
+            f"SELECT COUNT(*) FROM {cls._q_table} WHERE {where_clause}"
         )
 
     @classmethod
@@ -122,6 +245,6 @@ class Adapter(Table):
         """Check if primary key (pk) exists in table."""
         await cls.setup(con)
         return await con.select_one(
-            f"SELECT COUNT(*) FROM {con.quote(cls.table_name)}"
-            f" WHERE {con.quote(cls.pk)}={con.escape(pk)}"
+            f"SELECT COUNT(*) FROM {cls._q_table}"
+            f" WHERE {cls._q_pk}={con.escape(pk)}"
         )
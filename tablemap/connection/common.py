@@ -1,26 +1,96 @@
 """routines common to all cursors"""
 
 import abc
+import asyncio
+import collections
+import functools
+import inspect
+import itertools
+import time
+
+# (db_key, tablename) -> (primary_key_column_name, (column_name_1, ...))
+_SCHEMA_CACHE = {}
 
 
 class Cursor(abc.ABC):
-    """generic cursor extensions"""
+    """generic cursor extensions
+
+    the underlying database cursor is available as cursor_
+    """
+
+    __slots__ = ("cursor_", "db_key_", "pool_")
 
-    def __init__(self, cursor):
+    copy_chunk_size = 1000  # rows per INSERT statement in copy_in
+
+    def __init__(self, cursor, db_key=None):
         self.cursor_ = cursor
+        self.db_key_ = db_key  # identifies the database for the schema cache
+        self.pool_ = None  # set if cursor is managed by a Pool
+
+    async def execute(self, *args, **kwargs):
+        """execute a statement"""
+        return await self.cursor_.execute(*args, **kwargs)
+
+    async def executemany(self, *args, **kwargs):
+        """execute a statement for each set of parameters"""
+        return await self.cursor_.executemany(*args, **kwargs)
+
+    async def fetchone(self):
+        """fetch the next row of the result set"""
+        return await self.cursor_.fetchone()
+
+    async def fetchmany(self, *args, **kwargs):
+        """fetch the next set of rows of the result set"""
+        return await self.cursor_.fetchmany(*args, **kwargs)
+
+    async def fetchall(self):
+        """fetch the remaining rows of the result set"""
+        return await self.cursor_.fetchall()
+
+    async def close(self):
+        """close the underlying cursor"""
+        # aiomysql's close is a coroutine; aiopg's is not
+        if inspect.isawaitable(result := self.cursor_.close()):
+            await result
+
+    @property
+    def rowcount(self):
+        """number of rows affected by the last statement"""
+        return self.cursor_.rowcount
+
+    @property
+    def description(self):
+        """column descriptions of the result set"""
+        return self.cursor_.description
 
-    def __getattr__(self, name):
-        return getattr(self.cursor_, name)  # delegate
+    @property
+    def lastrowid(self):
+        """auto increment id of the last inserted row"""
+        return self.cursor_.lastrowid
 
     async def __aenter__(self):
         """support async with"""
         return self
 
     async def __aexit__(self, exc_type, exc_value, exc_traceback):
-        """support async with"""
-        if not exc_type:
-            await self.commit()
-        await self.close()
+        """support async with
+
+        a pooled cursor is returned to its pool instead of being closed; if
+        the block (or the commit) fails, the cursor is discarded
+        """
+        is_ok = False
+        try:
+            if not exc_type:
+                await self.commit()
+                is_ok = True
+        finally:
+            if self.pool_:
+                await self.pool_.release(self, discard=not is_ok, clean=is_ok)
+            else:
+                await self.close()
+
+    async def begin(self):
+        """start a transaction (a no-op where a transaction is implicit)"""
 
     async def ping(self):
         """simple round-trip to the database"""
@@ -40,9 +110,21 @@ class Cursor(abc.ABC):
         """return a list of dicts from an arbitrary query"""
         await self.execute(query)
         resultset = await self.fetchall()
-        col_names = [row[0] for row in self.description]
+        col_names = tuple(col[0] for col in self.description)
         return [dict(zip(col_names, row)) for row in resultset]
 
+    async def select_as(self, query, factory=None):
+        """return a list of objects from an arbitrary query
+
+        each row is built with factory(*row); the default factory is a
+        namedtuple of the column names, which avoids building a dict per row
+        """
+        await self.execute(query)
+        resultset = await self.fetchall()
+        if factory is None:
+            factory = row_type(tuple(col[0] for col in self.description))
+        return list(itertools.starmap(factory, resultset))
+
     async def select_one(self, query):
         """return single value from query
 
@@ -52,14 +134,47 @@ class Cursor(abc.ABC):
         (value,) = await self.fetchone()
         return value
 
+    async def copy_in(self, table, columns, rows):
+        """insert rows (sequences of values for columns) into table in bulk
+
+        return the number of rows inserted
+
+        rows are inserted with one multi-row INSERT per copy_chunk_size rows;
+        values are passed as parameters
+        """
+        cols = ",".join(self.quote(col) for col in columns)
+        placeholders = f"({','.join(['%s'] * len(columns))})"
+        row_count = 0
+        for start in range(0, len(rows), self.copy_chunk_size):
+            chunk = rows[start : start + self.copy_chunk_size]
+            vals = ",".join([placeholders] * len(chunk))
+            insert = f"INSERT INTO {self.quote(table)} ({cols}) VALUES {vals}"
+            await self.execute(insert, [value for row in chunk for value in row])
+            row_count += self.rowcount
+        return row_count
+
+    def invalidate_schema(self, tablename=None):
+        """forget cached columns for tablename (or every table in the database)
+
+        use after DDL changes a table; a Table class that is already set up
+        will also need is_init reset to False
+        """
+        for key in list(_SCHEMA_CACHE):
+            if key[0] == self.db_key_ and tablename in (None, key[1]):
+                del _SCHEMA_CACHE[key]
+
     def quote(self, data: str) -> str:
         """properly quote a database table or column name"""
-        return f"{self.quote_char}{data}{self.quote_char}"
+        quote_char = self.quote_char
+        return f"{quote_char}{data}{quote_char}"
 
     @property
     @abc.abstractmethod
     def quote_char(self):
-        """return character that delimits table or column names"""
+        """return character that delimits table or column names
+
+        implementations can override this with a plain class attribute
+        """
 
     @abc.abstractmethod
     def escape(self, value):
@@ -70,24 +185,69 @@ class Cursor(abc.ABC):
         """return primary_key_column_name, [column_name_1, ...] for a table
 
         list of column names excludes the primary key
+
+        decorate implementations with cache_columns
         """
 
     @abc.abstractmethod
-    async def insert_auto_pk(self, insert_statement, pk_column):
+    async def insert_auto_pk(self, insert_statement, pk_column, params=None):
         """execute an insert statement with an auto increment primary key
 
+        params are passed to execute along with the statement
+
         return tuple:
             insert_statement (possibly modified)
             primary key value of inserted row
         """
 
+    @abc.abstractmethod
+    async def insert_many_auto_pk(self, insert_statement, pk_column):
+        """execute a multi-row insert statement with an auto increment primary key
+
+        return tuple:
+            insert_statement (possibly modified)
+            list of primary key values of inserted rows
+        """
+
+
+def cache_columns(columns):
+    """decorator that caches a Cursor.columns implementation
+
+    results are cached for the process by (db_key, tablename); nothing is
+    cached if the cursor's database is not known (db_key_ is None), or if the
+    table has no columns (it may not exist yet)
+    """
+
+    @functools.wraps(columns)
+    async def _columns(self, tablename):
+        if self.db_key_ is None:
+            return await columns(self, tablename)
+        key = (self.db_key_, tablename)
+        if (result := _SCHEMA_CACHE.get(key)) is None:
+            pk, fields = await columns(self, tablename)
+            result = (pk, tuple(fields))
+            if pk or fields:
+                _SCHEMA_CACHE[key] = result
+        pk, fields = result
+        return pk, list(fields)
+
+    return _columns
+
+
+@functools.lru_cache(maxsize=128)
+def row_type(col_names: tuple):
+    """return a (cached) namedtuple class for a tuple of column names"""
+    return collections.namedtuple("Row", col_names, rename=True)
+
 
 def escape(value, quote, escaped_quote):
     """handy escape function for SQL values"""
     if value is None:
         return "NULL"
-    value = str(value)
-    value = value.replace(quote, escaped_quote)
+    if type(value) is not str:  # pylint: disable=unidiomatic-typecheck
+        value = str(value)
+    if quote in value:  # skip the replace scan in the common case
+        value = value.replace(quote, escaped_quote)
     return f"{quote}{value}{quote}"
 
 
@@ -104,6 +264,11 @@ class Connector(abc.ABC):
         self.kwargs = kwargs
         return self
 
+    @property
+    def db_key(self):
+        """identify the database (used to key the schema cache), or None"""
+        return None
+
     @abc.abstractmethod
     async def connect(self):
         """return a connection/cursor to the database"""
@@ -111,3 +276,131 @@ class Connector(abc.ABC):
     @abc.abstractmethod
     async def close(self):
         """clean up any resources"""
+
+    async def create_pool(self, min_size=1, max_size=10, idle_timeout=60):
+        """return a Pool of cursors created by this connector"""
+        pool = Pool(self, min_size, max_size, idle_timeout)
+        await pool.open()
+        return pool
+
+
+class Pool:
+    """re-usable cursors
+
+    use:
+        async with pool.acquire() as con:
+            ...
+
+    at most max_size cursors are open at one time; min_size cursors are
+    opened eagerly. A cursor that has been idle for more than idle_timeout
+    seconds is checked with ping before it is re-used, and replaced if the
+    check fails.
+    """
+
+    def __init__(self, connector, min_size=1, max_size=10, idle_timeout=60):
+        self.connector = connector
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.size = 0  # number of open cursors
+        self.idle = asyncio.Queue()  # (cursor, idle since)
+        self.semaphore = asyncio.Semaphore(max_size)
+
+    async def open(self):
+        """open min_size cursors"""
+        while self.size < self.min_size:
+            cursor = await self._connect()
+            await cursor.commit()  # idle cursors are outside of a transaction
+            self.idle.put_nowait((cursor, time.monotonic()))
+
+    async def close(self):
+        """close idle cursors"""
+        while not self.idle.empty():
+            cursor, _ = self.idle.get_nowait()
+            await self._discard(cursor)
+
+    def acquire(self):
+        """return a cursor from the pool
+
+        use either "async with pool.acquire() as con" or
+        "con = await pool.acquire()", followed by "pool.release(con)"
+        """
+        return _Acquire(self)
+
+    async def release(self, cursor, discard=False, clean=False):
+        """return a cursor to the pool
+
+        any open transaction is rolled back before the cursor is re-used,
+        unless clean indicates that it was already committed; a discarded
+        cursor (or one that fails the rollback) is closed instead
+        """
+        try:
+            if not discard and not clean:
+                try:
+                    await cursor.rollback()
+                except Exception:  # pylint: disable=broad-exception-caught
+                    discard = True
+            if discard:
+                await self._discard(cursor)
+            else:
+                self.idle.put_nowait((cursor, time.monotonic()))
+        finally:
+            self.semaphore.release()
+
+    async def _acquire(self):
+        await self.semaphore.acquire()
+        try:
+            while not self.idle.empty():
+                cursor, idle_since = self.idle.get_nowait()
+                try:
+                    if time.monotonic() - idle_since > self.idle_timeout:
+                        await cursor.ping()
+                    await cursor.begin()
+                    return cursor
+                except Exception:  # pylint: disable=broad-exception-caught
+                    await self._discard(cursor)
+            return await self._connect()
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    async def _connect(self):
+        cursor = await self.connector.connect()
+        cursor.pool_ = self
+        self.size += 1
+        return cursor
+
+    async def _discard(self, cursor):
+        self.size -= 1
+        # get the connection first: aiomysql forgets it when the cursor closes
+        connection = getattr(cursor.cursor_, "connection", None)
+        for close in (
+            cursor.rollback,
+            cursor.close,
+            getattr(connection, "close", None),
+        ):
+            if close is None:
+                continue
+            try:
+                if inspect.isawaitable(result := close()):
+                    await result
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass  # the connection is being dropped anyway
+
+
+class _Acquire:  # pylint: disable=too-few-public-methods
+    """awaitable/async context manager returned by Pool.acquire"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.cursor = None
+
+    def __await__(self):
+        return self.pool._acquire().__await__()  # pylint: disable=protected-access
+
+    async def __aenter__(self):
+        self.cursor = await self.pool._acquire()  # pylint: disable=protected-access
+        return await self.cursor.__aenter__()
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.cursor.__aexit__(exc_type, exc_value, exc_traceback)
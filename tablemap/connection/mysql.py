@@ -11,7 +11,14 @@ class MysqlConnector(common.Connector):
     async def connect(self):
         connection = await aiomysql.connect(*self.args, **self.kwargs)
         cursor = await connection.cursor()
-        return MysqlCursor(cursor)
+        return MysqlCursor(cursor, self.db_key)
+
+    @property
+    def db_key(self):
+        kwargs = self.kwargs or {}
+        if "db" not in kwargs:
+            return None
+        return kwargs.get("host"), kwargs.get("port"), kwargs["db"]
 
     async def close(self):
         pass
@@ -20,13 +27,23 @@ class MysqlConnector(common.Connector):
 class MysqlCursor(common.Cursor):
     """mysql cursor extension"""
 
-    @property
-    def quote_char(self):
-        return "`"
+    __slots__ = ()
+
+    quote_char = "`"
+
+    async def copy_in(self, table, columns, rows):
+        cols = ",".join(self.quote(col) for col in columns)
+        vals = ",".join(["%s"] * len(columns))
+        # aiomysql batches the rows into multi-row INSERTs (max_stmt_length)
+        await self.executemany(
+            f"INSERT INTO {self.quote(table)} ({cols}) VALUES ({vals})", rows
+        )
+        return self.rowcount
 
     def escape(self, value):
         return common.escape(value, "'", r"\'")
 
+    @common.cache_columns
     async def columns(self, tablename):
         query = f"DESCRIBE {self.quote(tablename)}"
         cols = await self.select(query)
@@ -35,6 +52,12 @@ class MysqlCursor(common.Cursor):
         fields = [f["Field"] for f in cols if f["Field"] != pk]
         return pk, fields
 
-    async def insert_auto_pk(self, insert_statement, _):
-        await self.execute(insert_statement)
+    async def insert_auto_pk(self, insert_statement, _, params=None):
+        await self.execute(insert_statement, params)
         return insert_statement, self.lastrowid
+
+    async def insert_many_auto_pk(self, insert_statement, _):
+        await self.execute(insert_statement)
+        # LAST_INSERT_ID is the id of the first row; the rest are consecutive
+        first = self.lastrowid
+        return insert_statement, list(range(first, first + self.rowcount))
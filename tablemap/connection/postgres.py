@@ -10,24 +10,39 @@ class PsqlConnector(common.Connector):
 
     async def connect(self):
         connection = await aiopg.connect(*self.args, **self.kwargs)
-        cursor = await connection.cursor()
-        await cursor.execute("BEGIN TRANSACTION")
-        return PsqlCursor(cursor)
+        cursor = PsqlCursor(await connection.cursor(), self.db_key)
+        await cursor.begin()
+        return cursor
 
     async def close(self):
         pass
 
+    @property
+    def db_key(self):
+        if self.args:
+            return self.args[0]  # dsn
+        kwargs = self.kwargs or {}
+        if dsn := kwargs.get("dsn"):
+            return dsn
+        if not (database := kwargs.get("database") or kwargs.get("dbname")):
+            return None
+        return kwargs.get("host"), kwargs.get("port"), database
+
 
 class PsqlCursor(common.Cursor):
     """pysql cursor extension"""
 
-    @property
-    def quote_char(self):
-        return '"'
+    __slots__ = ()
+
+    quote_char = '"'
+
+    async def begin(self):
+        await self.execute("BEGIN TRANSACTION")
 
     def escape(self, value):
         return common.escape(value, "'", "''")
 
+    @common.cache_columns
     async def columns(self, tablename):
         query = (
             "SELECT c.column_name AS fieldname"
@@ -44,8 +59,14 @@ class PsqlCursor(common.Cursor):
         fields = [f["fieldname"] for f in cols if f["pk"] == 0]
         return pk, fields
 
-    async def insert_auto_pk(self, insert_statement, pk_column):
+    async def insert_auto_pk(self, insert_statement, pk_column, params=None):
         insert = f'{insert_statement} RETURNING "{pk_column}"'
-        await self.execute(insert)
+        await self.execute(insert, params)
         (pk,) = await self.fetchone()
         return insert, pk
+
+    async def insert_many_auto_pk(self, insert_statement, pk_column):
+        insert = f'{insert_statement} RETURNING "{pk_column}"'
+        await self.execute(insert)
+        pks = [pk for (pk,) in await self.fetchall()]
+        return insert, pks
@@ -44,24 +44,83 @@ class SpecialHandling:  # pylint: disable=too-few-public-methods
         self.save_fn = save_fn
 
 
+class Result(int):
+    """number of rows affected by an operation, with details of the operation
+
+    a Result is an int (the row count); it also carries:
+        last_id: primary key of the (first) inserted row, or None
+        last_ids: primary keys of rows inserted by insert_many, or None
+        last_query: SQL statement executed
+
+    unlike the Table class variables of the same names, a Result is not
+    shared with other (possibly concurrent) operations on the same class
+    """
+
+    def __new__(cls, row_count=0, last_query=None, last_id=None, last_ids=None):
+        result = super().__new__(cls, row_count or 0)
+        result.last_query = last_query
+        result.last_id = last_id
+        result.last_ids = last_ids
+        return result
+
+    @property
+    def row_count(self) -> int:
+        """number of rows affected"""
+        return int(self)
+
+
+def _is_dict_list(rows) -> bool:
+    """return True if rows is a list (or tuple) of dicts"""
+    return isinstance(rows, (list, tuple)) and all(
+        isinstance(row, dict) for row in rows
+    )
+
+
 class Table:
     """SQL table to dict mapper
 
     specify value for:
         table_name: name of the SQL table
+
+    optionally specify value for:
+        copy_threshold: insert_many uses copy_in for more rows than this
     """
 
     table_name = None
+    copy_threshold = 1000
 
-    # these values are managed internally
+    # these values are managed internally; last_id, last_ids, last_query and
+    # row_count describe the most recent operation on the class, which is not
+    # reliable if operations run concurrently (use the returned Result)
     query_fields = None
-    special = {}
+    special = {}  # name -> SpecialHandling
+    calculated = {}  # name -> Calculated
     pk = None
     fields = []
     last_id = None
+    last_ids = None
     last_query = None
     row_count = None
     is_init = False
+    _q_table = None  # quoted table_name
+    _q_pk = None  # quoted pk
+    _select = None  # "SELECT <query_fields> FROM <table> WHERE "
+    _pk_condition = None  # "<pk>=%s"
+    _q_fields = {}  # field (or pk) name -> quoted name
+    _field_set = frozenset()  # fields, for fast membership tests
+    _cols_cache = {}  # (statement kind, columns) -> statement template
+
+    def __init_subclass__(cls, **kwargs):
+        """collect SpecialHandling and Calculated attributes at class creation"""
+        super().__init_subclass__(**kwargs)
+        attrs = {}
+        for klass in reversed(cls.__mro__):
+            attrs.update(vars(klass))
+        names = sorted(attrs)
+        cls.special = {
+            k: v for k in names if isinstance(v := attrs[k], SpecialHandling)
+        }
+        cls.calculated = {k: v for k in names if isinstance(v := attrs[k], Calculated)}
 
     @classmethod
     async def setup(cls, con):
@@ -69,57 +128,70 @@ class Table:
 
         idempotently initialize class with table attributes
         """
+        cls._reset_result()
+        if not cls.is_init:
+            await cls._init_schema(con)
+
+    @classmethod
+    def _reset_result(cls):
+        """clear the results of the previous operation"""
         cls.last_id = None
+        cls.last_ids = None
         cls.last_query = None
         cls.row_count = None
-        if not cls.is_init:
-            # extract fields names from database
-            cls.pk, cls.fields = await con.columns(cls.table_name)
-
-            # setup SpecialHandling fields
-            cls.special = {
-                k: v
-                for k in dir(cls)
-                if isinstance(v := getattr(cls, k), SpecialHandling)
-            }
-
-            # setup field list for the query method
-            fields = [con.quote(cls.pk)]
-
-            def read_column(con, column_name):
-                """quote or perform special handling for queried columns"""
-                result = con.quote(column_name)
-                if column_name in cls.special:
-                    special = cls.special[column_name]
-                    if hasattr(special, "read_column_fn"):
-                        result = (
-                            special.read_column_fn(con, column_name)
-                            + f" AS {con.quote(column_name)}"
-                        )
-                return result
-
-            fields.extend(read_column(con, col) for col in cls.fields)
-            fields.extend(
-                f"{v.value} AS {con.quote(k)}"
-                for k in dir(cls)
-                if isinstance(v := getattr(cls, k), Calculated)
-            )
-            cls.query_fields = ",".join(fields)
-
-            cls.is_init = True
+
+    @classmethod
+    async def _init_schema(cls, con):
+        """initialize class with table attributes (run once)"""
+
+        # extract fields names from database
+        cls.pk, cls.fields = await con.columns(cls.table_name)
+        cls._field_set = frozenset(cls.fields)
+
+        # cache quoted names
+        cls._q_table = con.quote(cls.table_name)
+        cls._q_pk = con.quote(cls.pk)
+        cls._q_fields = {col: con.quote(col) for col in [cls.pk, *cls.fields]}
+
+        # setup field list for the query method
+        fields = [cls._q_pk]
+
+        def read_column(con, column_name):
+            """quote or perform special handling for queried columns"""
+            result = cls._q_fields[column_name]
+            if (special := cls.special.get(column_name)) and special.read_column_fn:
+                result = special.read_column_fn(con, column_name) + f" AS {result}"
+            return result
+
+        fields.extend(read_column(con, col) for col in cls.fields)
+        fields.extend(f"{v.value} AS {con.quote(k)}" for k, v in cls.calculated.items())
+        cls.query_fields = ",".join(fields)
+
+        # constant parts of query statements
+        cls._select = f"SELECT {cls.query_fields} FROM {cls._q_table} WHERE "
+        cls._pk_condition = f"{cls._q_pk}=%s"
+        cls._cols_cache = {}  # statements built from the attributes above
+
+        cls.is_init = True
+
+    @classmethod
+    def _result(cls, row_count, last_query, last_id=None, last_ids=None) -> Result:
+        """return a Result, also recording it in the class variables"""
+        cls.row_count = row_count
+        cls.last_query = last_query
+        cls.last_id = last_id
+        cls.last_ids = last_ids
+        return Result(row_count, last_query, last_id, last_ids)
 
     @classmethod
     def escape(cls, con, column_name, column_value):
         """escape or perform special handling for column values"""
-        value = con.escape(column_value)
-        if column_name in cls.special:
-            special = cls.special[column_name]
-            if hasattr(special, "save_fn"):
-                value = special.save_fn(con, column_value)
-        return value
+        if (special := cls.special.get(column_name)) and special.save_fn:
+            return special.save_fn(con, column_value)
+        return con.escape(column_value)
 
     @classmethod
-    async def save(cls, con, data: dict, raw: dict = None) -> int:
+    async def save(cls, con, data: dict, raw: dict = None) -> Result:
         """save data (dict) to underlying table
 
         raw is a dict of column_name/values that will not be escaped
@@ -128,80 +200,238 @@ class Table:
             raise ValueError("expecting a dict")
         await cls.setup(con)
         if cls.pk in data:
-            await cls.update(con, data, raw)
-        else:
-            await cls.insert(con, data, raw)
-        return cls.row_count
+            return await cls.update(con, data, raw)
+        return await cls.insert(con, data, raw)
 
     @classmethod
-    async def insert(cls, con, data: dict, raw: dict = None) -> int:
+    async def insert(cls, con, data: dict, raw: dict = None) -> Result:
         """insert data (dict) into underlying table
 
         raw is a dict of column_name/values that will not be escaped
+
+        values are passed to the database as parameters of a cached statement,
+        unless raw or a SpecialHandling column is involved, in which case the
+        values are escaped into the statement
         """
         if not isinstance(data, dict):
             raise ValueError("expecting a dict")
         await cls.setup(con)
-        ins = {k: cls.escape(con, k, v) for k, v in data.items() if k in cls.fields}
+        columns = tuple(k for k in data if k in cls._field_set)
+        if cls.pk in data:
+            columns += (cls.pk,)
+        if raw or any(col in cls.special for col in columns):
+            insert, params = cls._inline_insert(con, data, raw), None
+        elif columns:
+            insert = cls._insert_template(columns)
+            params = tuple(data[k] for k in columns)
+        else:
+            insert = params = None
+        if insert:
+            last_id = None
+            if cls.pk in data:
+                await con.execute(insert, params)
+            else:
+                insert, last_id = await con.insert_auto_pk(insert, cls.pk, params)
+            return cls._result(con.rowcount, insert, last_id)
+        return Result()
+
+    @classmethod
+    def _insert_template(cls, columns: tuple) -> str:
+        """return an INSERT statement with a placeholder for each column"""
+        key = ("insert", columns)
+        if (template := cls._cols_cache.get(key)) is None:
+            vals = ",".join(["%s"] * len(columns))
+            template = f"{cls._insert_prefix(columns)}({vals})"
+            cls._cols_cache[key] = template
+        return template
+
+    @classmethod
+    def _insert_prefix(cls, columns: tuple) -> str:
+        """return "INSERT INTO <table> (<columns>) VALUES " for columns"""
+        key = ("prefix", columns)
+        if (prefix := cls._cols_cache.get(key)) is None:
+            cols = ",".join(cls._q_fields[col] for col in columns)
+            prefix = f"INSERT INTO {cls._q_table} ({cols}) VALUES "
+            cls._cols_cache[key] = prefix
+        return prefix
+
+    @classmethod
+    def _inline_insert(cls, con, data: dict, raw: dict = None) -> str:
+        """return an INSERT statement with escaped values (or None)"""
+        q_fields = cls._q_fields
+        ins = {
+            q_fields[k]: cls.escape(con, k, v)
+            for k, v in data.items()
+            if k in cls._field_set
+        }
         if cls.pk in data:
-            ins[cls.pk] = con.escape(data[cls.pk])
+            ins[cls._q_pk] = con.escape(data[cls.pk])
         if raw:
-            ins.update(raw)  # overlay insert with raw items
-        if ins:
-            cols = ",".join(f"{con.quote(col)}" for col in ins.keys())
-            vals = ",".join(v for v in ins.values())
-            insert = f"INSERT INTO {con.quote(cls.table_name)} ({cols}) VALUES ({vals})"
+            # overlay insert with raw items
+            ins.update((con.quote(k), v) for k, v in raw.items())
+        if not ins:
+            return None
+        cols = ",".join(ins.keys())
+        vals = ",".join(ins.values())
+        return f"INSERT INTO {cls._q_table} ({cols}) VALUES ({vals})"
 
-            cls.last_query = insert
-            if cls.pk in data:
+    @classmethod
+    async def insert_many(cls, con, rows: list, raw: dict = None) -> Result:
+        """insert a list of dicts into underlying table with a single statement
+
+        every row must have the same columns (ValueError), since a missing
+        column would insert NULL instead of the column's default
+
+        raw is a dict of column_name/values that will not be escaped (the same
+        raw values are used for every row)
+        """
+        if not _is_dict_list(rows):
+            raise ValueError("expecting a list of dicts")
+        await cls.setup(con)
+        raw = raw or {}
+        if not rows:
+            return Result()
+        columns = cls._row_columns(rows, raw)
+        has_pk = cls.pk in rows[0] or cls.pk in raw
+        if (
+            len(rows) > cls.copy_threshold
+            and has_pk
+            and not raw
+            and not any(col in cls.special for col in columns)
+        ):
+            return await cls.copy_in(con, rows)
+        if columns or raw:
+            raw_values = list(raw.values())
+
+            escape = cls.escape
+
+            def row_values(row):
+                vals = [escape(con, col, row.get(col)) for col in columns]
+                return f"({','.join(vals + raw_values)})"
+
+            if raw:
+                q_columns = [cls._q_fields[col] for col in columns]
+                cols = ",".join(q_columns + [con.quote(col) for col in raw])
+                prefix = f"INSERT INTO {cls._q_table} ({cols}) VALUES "
+            else:
+                prefix = cls._insert_prefix(tuple(columns))
+            insert = prefix + ",".join(row_values(row) for row in rows)
+
+            last_ids = None
+            if has_pk:
                 await con.execute(insert)
             else:
-                insert, cls.last_id = await con.insert_auto_pk(insert, cls.pk)
-            cls.last_query = insert
+                insert, last_ids = await con.insert_many_auto_pk(insert, cls.pk)
+            last_id = last_ids[0] if last_ids else None
+            return cls._result(con.rowcount, insert, last_id, last_ids)
+        return Result()
+
+    @classmethod
+    def _row_columns(cls, rows: list, raw: dict = None) -> list:
+        """return the columns to insert for rows (excluding raw columns)
+
+        raise ValueError if the rows don't all have the same columns
+        """
+        field_set, pk = cls._field_set, cls.pk
+
+        def row_keys(row):
+            return frozenset(k for k in row if k in field_set or k == pk)
+
+        first = row_keys(rows[0])
+        if any(row_keys(row) != first for row in rows):
+            raise ValueError("expecting every row to have the same columns")
+        columns = [k for k in rows[0] if k in field_set]
+        if pk in first:
+            columns.append(pk)
+        return [col for col in columns if col not in (raw or ())]
 
-            cls.row_count = con.rowcount
-        return cls.row_count
+    @classmethod
+    async def copy_in(cls, con, rows: list) -> Result:
+        """bulk insert a list of dicts into underlying table
+
+        every row must have the same columns (ValueError)
+
+        values are not passed through SpecialHandling, and database-generated
+        primary keys are not returned
+        """
+        if not _is_dict_list(rows):
+            raise ValueError("expecting a list of dicts")
+        await cls.setup(con)
+        if rows:
+            if columns := cls._row_columns(rows):
+                values = [tuple(row.get(col) for col in columns) for row in rows]
+                row_count = await con.copy_in(cls.table_name, columns, values)
+                return cls._result(row_count, None)
+        return Result()
 
     @classmethod
-    async def update(cls, con, data: dict, raw: dict = None) -> int:
+    async def update(cls, con, data: dict, raw: dict = None) -> Result:
         """update underlying table with values in data (dict)
 
         raw is a dict of column_name/values that will not be escaped
+
+        values are passed to the database as parameters of a cached statement,
+        unless raw or a SpecialHandling column is involved, in which case the
+        values are escaped into the statement
         """
         if not isinstance(data, dict):
             raise ValueError("expecting a dict")
         await cls.setup(con)
         if cls.pk not in data:
             raise AttributeError(f"primary key ({cls.pk}) not provided")
-        upd = {k: cls.escape(con, k, v) for k, v in data.items() if k in cls.fields}
+        columns = tuple(k for k in data if k in cls._field_set)
+        if raw or any(col in cls.special for col in columns):
+            update, params = cls._inline_update(con, data, raw), None
+        elif columns:
+            update = cls._update_template(columns)
+            params = tuple(data[k] for k in columns) + (data[cls.pk],)
+        else:
+            update = params = None
+        if update:
+            await con.execute(update, params)
+            return cls._result(con.rowcount, update)
+        return Result()
+
+    @classmethod
+    def _update_template(cls, columns: tuple) -> str:
+        """return an UPDATE statement with a placeholder for each column and pk"""
+        key = ("update", columns)
+        if (template := cls._cols_cache.get(key)) is None:
+            upd = ",".join(f"{cls._q_fields[col]}=%s" for col in columns)
+            template = f"UPDATE {cls._q_table} SET {upd} WHERE {cls._pk_condition}"
+            cls._cols_cache[key] = template
+        return template
+
+    @classmethod
+    def _inline_update(cls, con, data: dict, raw: dict = None) -> str:
+        """return an UPDATE statement with escaped values (or None)"""
+        q_fields = cls._q_fields
+        upd = {
+            q_fields[k]: cls.escape(con, k, v)
+            for k, v in data.items()
+            if k in cls._field_set
+        }
         if raw:
-            upd.update(raw)  # overlay update with raw items
-        if upd:
-            upd = ",".join(f"{con.quote(k)}={v}" for k, v in upd.items())
-            cls.last_query = (
-                f"UPDATE {con.quote(cls.table_name)}"
-                f" SET {upd}"
-                f" WHERE {con.quote(cls.pk)}={con.escape(data[cls.pk])}"
-            )
-            await con.execute(cls.last_query)
-            cls.row_count = con.rowcount
-        return cls.row_count
-
-    @classmethod
-    async def delete(cls, con, condition, *args) -> int:
+            # overlay update with raw items
+            upd.update((con.quote(k), v) for k, v in raw.items())
+        if not upd:
+            return None
+        upd = ",".join(f"{k}={v}" for k, v in upd.items())
+        return (
+            f"UPDATE {cls._q_table}"
+            f" SET {upd}"
+            f" WHERE {cls._q_pk}={con.escape(data[cls.pk])}"
+        )
+
+    @classmethod
+    async def delete(cls, con, condition, *args) -> Result:
         """delete from underlying table"""
         await cls.setup(con)
         if args:
-            args = [con.escape(arg) for arg in args]
-            if len(args) == 1:
-                args = args[0]
-            condition = condition % args
-        cls.last_query = (
-            f"DELETE FROM {con.quote(cls.table_name)}" f" WHERE {condition}"
-        )
-        await con.execute(cls.last_query)
-        cls.row_count = con.rowcount
-        return cls.row_count
+            condition = condition % tuple(map(con.escape, args))
+        delete = f"DELETE FROM {cls._q_table} WHERE {condition}"
+        await con.execute(delete)
+        return cls._result(con.rowcount, delete)
 
     @classmethod
     def build(  # pylint: disable=too-many-arguments
@@ -210,14 +440,11 @@ class Table:
         """build a query string"""
         if args:
             if isinstance(args, (list, tuple)):
-                args = [con.escape(arg) for arg in args]
+                args = tuple(map(con.escape, args))
             else:
                 args = con.escape(args)
             condition = condition % args
-        query = (
-            f"SELECT {cls.query_fields}"
-            f" FROM {con.quote(cls.table_name)} WHERE {condition}"
-        )
+        query = cls._select + condition
         if limit is not None:
             query += f" LIMIT {limit}"
             if offset is not None:
@@ -228,18 +455,30 @@ class Table:
     async def load(cls, con, pk) -> dict:
         """return a dict (or None) for a row with primary_key=key"""
         await cls.setup(con)
-        cls.last_query = cls.build(con, f"{con.quote(cls.pk)}=%s", pk, limit=1)
-        rs = await con.select(cls.last_query)
-        cls.row_count = len(rs)
-        return rs[0] if cls.row_count else None
+        cls.last_query = query = cls.build(con, cls._pk_condition, pk, limit=1)
+        rs = await con.select(query)
+        cls.row_count = row_count = len(rs)
+        return rs[0] if row_count else None
+
+    @classmethod
+    async def load_many(cls, con, pks: list) -> list:
+        """return a list of rows (in no particular order) for primary keys
+
+        all of the rows are read with a single "pk IN (...)" query
+        """
+        if not pks:
+            return []
+        await cls.setup(con)
+        condition = f"{cls._q_pk} IN ({','.join(['%s'] * len(pks))})"
+        return await cls.query(con, condition, list(pks)) or []
 
     @classmethod
     # pylint: disable-next=too-many-arguments
     async def query(cls, con, condition="1=1", args=None, limit=None, offset=None):
         """return a list of dicts for each row matching condition"""
         await cls.setup(con)
-        cls.last_query = cls.build(con, condition, args, limit, offset)
-        rs = await con.select(cls.last_query)
+        cls.last_query = query = cls.build(con, condition, args, limit, offset)
+        rs = await con.select(query)
         cls.row_count = con.rowcount
 
         if limit == 1:
@@ -248,3 +487,18 @@ class Table:
             else:
                 rs = None
         return rs
+
+    @classmethod
+    async def query_rows(  # pylint: disable=too-many-arguments
+        cls, con, condition="1=1", args=None, limit=None, offset=None, *, factory=None
+    ) -> list:
+        """return a list of rows matching condition
+
+        rows are built with factory(*row) (default: a namedtuple of the column
+        names) instead of a dict, which is much cheaper for large results
+        """
+        await cls.setup(con)
+        cls.last_query = query = cls.build(con, condition, args, limit, offset)
+        rs = await con.select_as(query, factory)
+        cls.row_count = con.rowcount
+        return rs
@@ -1,5 +1,6 @@
 """fixtures"""
 
+import copy
 from unittest import mock
 
 import pytest
@@ -8,50 +9,197 @@ import tablemap
 from tablemap.connection import common
 
 
+class AsyncRecorder:
+    """a light-weight stand-in for mock.AsyncMock
+
+    calls are recorded in call_args_list; a call returns the result of
+    awaiting wraps(*args, **kwargs), if wraps is specified, else return_value
+    """
+
+    def __init__(self, return_value=None, wraps=None):
+        self.return_value = return_value
+        self.wraps = wraps
+        self.call_args_list = []
+
+    async def __call__(self, *args, **kwargs):
+        self.call_args_list.append(mock.call(*args, **kwargs))
+        if self.wraps:
+            return await self.wraps(*args, **kwargs)
+        return self.return_value
+
+    @property
+    def call_count(self):
+        """number of times called"""
+        return len(self.call_args_list)
+
+    def reset_mock(self):
+        """forget recorded calls"""
+        self.call_args_list.clear()
+
+    def assert_not_called(self):
+        """assert never called"""
+        assert not self.call_args_list, f"called {self.call_count} times"
+
+    def assert_called_once(self):
+        """assert called exactly once"""
+        assert self.call_count == 1, f"called {self.call_count} times"
+
+    def assert_called_with(self, *args, **kwargs):
+        """assert that the last call was made with args and kwargs"""
+        assert self.call_args_list, "not called"
+        expected, actual = mock.call(*args, **kwargs), self.call_args_list[-1]
+        assert actual == expected, f"expected {expected}, got {actual}"
+
+    def assert_called_once_with(self, *args, **kwargs):
+        """assert called exactly once, with args and kwargs"""
+        self.assert_called_once()
+        self.assert_called_with(*args, **kwargs)
+
+    def assert_any_call(self, *args, **kwargs):
+        """assert called at least once with args and kwargs"""
+        expected = mock.call(*args, **kwargs)
+        assert expected in self.call_args_list, f"{expected} not called"
+
+
+def _async_return(value):
+    """return an async function that returns value"""
+
+    async def _return(*args, **kwargs):  # pylint: disable=unused-argument
+        return value
+
+    return _return
+
+
+@pytest.fixture(scope="session")
+def async_return():
+    """return a factory for stub async functions that return a fixed value
+
+    use this where a test only needs a value back, not a record of the calls
+    """
+    return _async_return
+
+
+class Cursor(common.Cursor):  # pylint: disable=too-many-instance-attributes
+    """test cursor class
+
+    execute and fetchall are AsyncRecorders that "sink" calls to the database
+    insert_auto_pk is wrapped for called/not_called detection
+    rowcount and description are plain attributes (instead of properties
+    that read the underlying cursor)
+    """
+
+    rowcount = None
+    description = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.quote_ = "!"
+        self.columns_ = ["A", "B"]
+        self.primary_key_column_ = "pk"
+        self.primary_key_ = 100
+        self.rowcount = 1
+        self.execute = None
+        self.fetchall = None
+        self.description = []
+
+    @property
+    def quote_char(self):
+        return self.quote_
+
+    def escape(self, value):
+        return f">{value}<"
+
+    async def columns(self, tablename):
+        return self.primary_key_column_, self.columns_
+
+    async def insert_auto_pk(self, insert_statement, pk_column, params=None):
+        return insert_statement, self.primary_key_
+
+    async def insert_many_auto_pk(self, insert_statement, pk_column):
+        first = self.primary_key_
+        return insert_statement, list(range(first, first + self.rowcount))
+
+
+_CURSOR = Cursor(None)
+_CURSOR_STATE = dict(vars(_CURSOR))  # instance attributes as initialized
+
+
 @pytest.fixture
 def common_cursor():
-    """create a test cursor from common.Cursor with all abstract methods stubbed"""
-
-    # pylint: disable=too-many-instance-attributes
-    class Cursor(common.Cursor):
-        """test cursor class
-
-        execute and fetchall are mocked to "sink" calls to the database
-        insert_auto_pk is wrapped for called/not_called detection
-        """
-
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            self.quote_ = "!"
-            self.columns_ = ["A", "B"]
-            self.primary_key_column_ = "pk"
-            self.primary_key_ = 100
-            self.rowcount = 1
-            self.execute = None
-            self.fetchall = None
-            self.description = []
-
-        @property
-        def quote_char(self):
-            return self.quote_
-
-        def escape(self, value):
-            return f">{value}<"
-
-        async def columns(self, tablename):
-            return self.primary_key_column_, self.columns_
-
-        async def insert_auto_pk(self, insert_statement, pk_column):
-            return insert_statement, self.primary_key_
-
-    con = Cursor(None)
-    con.execute = mock.AsyncMock()
-    con.fetchall = mock.AsyncMock()
-    con.insert_auto_pk = mock.AsyncMock(wraps=con.insert_auto_pk)
+    """return a test cursor from common.Cursor with all abstract methods stubbed
+
+    the same Cursor instance is shared by every test; it is reset to its
+    initial state instead of being rebuilt
+    """
+    con = _CURSOR
+    state = vars(con)
+    state.clear()
+    state.update((k, copy.copy(v)) for k, v in _CURSOR_STATE.items())
+    con.cursor_ = con.db_key_ = con.pool_ = None
+    con.execute = AsyncRecorder()
+    con.fetchall = AsyncRecorder()
+    con.insert_auto_pk = AsyncRecorder(wraps=con.insert_auto_pk)
+    con.insert_many_auto_pk = AsyncRecorder(wraps=con.insert_many_auto_pk)
     return con
 
 
+class PoolConnector(common.Connector):
+    """test connector that always connects to the same cursor"""
+
+    def __init__(self, cursor):
+        super().__init__()
+        self.cursor = cursor
+
+    async def connect(self):
+        return self.cursor
+
+    async def close(self):
+        pass
+
+
 @pytest.fixture
+def pool_connector(common_cursor):  # pylint: disable=redefined-outer-name
+    """return a connector (for create_pool) that connects to common_cursor"""
+    return PoolConnector(common_cursor)
+
+
+class CursorStub:
+    """a minimal stand-in for a cursor that never touches the database
+
+    it quotes and escapes like Cursor, and describes the same table
+    """
+
+    quote_char = "!"
+
+    def quote(self, data: str) -> str:
+        """quote a table or column name"""
+        return f"!{data}!"
+
+    def escape(self, value):
+        """escape a value"""
+        return f">{value}<"
+
+    async def columns(self, tablename):  # pylint: disable=unused-argument
+        """return the primary key and the other column names"""
+        return "pk", ["A", "B"]
+
+
+@pytest.fixture(scope="session")
+def cursor_stub():
+    """return a CursorStub, for tests that never execute a statement"""
+    return CursorStub()
+
+
+def _reset_class(cls, attrs):
+    """restore the attributes of cls to a snapshot taken from vars(cls)"""
+    for name in set(vars(cls)) - set(attrs):
+        delattr(cls, name)
+    for name, value in attrs.items():
+        if vars(cls).get(name) is not value:
+            setattr(cls, name, value)
+
+
+@pytest.fixture(scope="session")
 def table():
     """return a mocked-up Table for testing"""
 
@@ -60,51 +208,48 @@ def table():
 
         table_name = "test_table"
 
-    MyTable.insert = mock.AsyncMock(wraps=MyTable.insert)
-    MyTable.update = mock.AsyncMock(wraps=MyTable.update)
-
     return MyTable
 
 
-@pytest.fixture
+class _MyClass:
+    """class for testing Adapter"""
+
+    # pylint: disable=invalid-name
+    def __init__(self, pk=None, A=None, B=None, C=None):
+        if pk:
+            self.pk = pk
+        if A:
+            self.A = A
+        if B:
+            self.B = B
+        if C:  # note: C is not in the database, so it is ignored
+            self.C = C
+
+    def serialize(self):
+        """create a dictionary from an instance of this class"""
+        result = {}
+        for key in ("pk", "A", "B", "C"):
+            if hasattr(self, key):
+                result[key] = getattr(self, key)
+        return result
+
+    @classmethod
+    def factory(cls, *args, **kwargs):
+        """build an instance of this class"""
+        if len(args) == 1 and not kwargs:
+            args0 = args[0]
+            if isinstance(args0, dict):
+                args, kwargs = (), args0
+        return cls(*args, **kwargs)
+
+
+@pytest.fixture(scope="session")
 def my_class():
     """return class for testing Adapter"""
-
-    class MyClass:
-        """class for testing Adapter"""
-
-        # pylint: disable=invalid-name
-        def __init__(self, pk=None, A=None, B=None, C=None):
-            if pk:
-                self.pk = pk
-            if A:
-                self.A = A
-            if B:
-                self.B = B
-            if C:  # note: C is not in the database, so it is ignored
-                self.C = C
-
-        def serialize(self):
-            """create a dictionary from an instance of this class"""
-            result = {}
-            for key in ("pk", "A", "B", "C"):
-                if hasattr(self, key):
-                    result[key] = getattr(self, key)
-            return result
-
-        @classmethod
-        def factory(cls, *args, **kwargs):
-            """build an instance of this class"""
-            if len(args) == 1 and not kwargs:
-                args0 = args[0]
-                if isinstance(args0, dict):
-                    kwargs = args0
-            return cls(*args, **kwargs)
-
-    return MyClass
+    return _MyClass
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def adapter(my_class):  # pylint: disable=redefined-outer-name
     """return a mocked-up ObjectTable for testing"""
 
@@ -115,7 +260,44 @@ def adapter(my_class):  # pylint: disable=redefined-outer-name
         object_serializer = my_class.serialize
         object_factory = my_class.factory
 
-    MyTable.before_save = mock.AsyncMock(wraps=MyTable.before_save)
-    MyTable.after_load = mock.AsyncMock(wraps=MyTable.after_load)
-
     return MyTable
+
+
+@pytest.fixture(scope="session")
+def table_snapshot(table):  # pylint: disable=redefined-outer-name
+    """return the attributes of the session-scoped Table as defined"""
+    return dict(vars(table))
+
+
+@pytest.fixture(scope="session")
+def adapter_snapshot(adapter):  # pylint: disable=redefined-outer-name
+    """return the attributes of the session-scoped Adapter as defined"""
+    return dict(vars(adapter))
+
+
+@pytest.fixture(autouse=True)
+def reset_classes(request):
+    """undo the previous test's changes to the session-scoped Table classes
+
+    class state (schema, results, attributes set by a test) is restored from
+    a snapshot, and the adapter's identity map is emptied; only the classes
+    used by the test are touched
+    """
+    if "table" in request.fixturenames:
+        cls = request.getfixturevalue("table")
+        _reset_class(cls, request.getfixturevalue("table_snapshot"))
+    if "adapter" in request.fixturenames:
+        cls = request.getfixturevalue("adapter")
+        _reset_class(cls, request.getfixturevalue("adapter_snapshot"))
+        cls._identity_map.clear()  # pylint: disable=protected-access
+
+
+@pytest.fixture
+def table_tracked_save(table):  # pylint: disable=redefined-outer-name
+    """return the test Table with insert and update wrapped to record calls
+
+    for tests of save, which delegates to insert or update
+    """
+    table.insert = AsyncRecorder(wraps=table.insert)
+    table.update = AsyncRecorder(wraps=table.update)
+    return table
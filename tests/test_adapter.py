@@ -1,146 +1,219 @@
 """test table operations"""
 
-import asyncio
-import random
+import types
+from unittest import mock
 
 import pytest
 
+FAKE_PK = 777  # an arbitrary primary key value
 
-def test_update(common_cursor, adapter, my_class):
-    """test the update method"""
-
-    async def _test():
-        data = my_class(pk=42, A=10, C=30)
-        await adapter.update(common_cursor, data)
-        assert adapter.last_query == ("UPDATE !a_table! SET !A!=>10< WHERE !pk!=>42<")
 
-    asyncio.run(_test())
+async def test_update(common_cursor, adapter, my_class):
+    """test the update method"""
+    data = my_class(pk=42, A=10, C=30)
+    await adapter.update(common_cursor, data)
+    assert adapter.last_query == ("UPDATE !a_table! SET !A!=%s WHERE !pk!=%s")
+    common_cursor.execute.assert_called_with(adapter.last_query, (10, 42))
 
 
-def test_insert_with_pk(common_cursor, adapter, my_class):
+async def test_insert_with_pk(common_cursor, adapter, my_class):
     """test the insert method with primary key"""
+    data = my_class(pk=42, A=10, C=30)
+    await adapter.insert(common_cursor, data)
+    assert adapter.last_query == ("INSERT INTO !a_table! (!A!,!pk!) VALUES (%s,%s)")
+    common_cursor.execute.assert_called_with(adapter.last_query, (10, 42))
 
-    async def _test():
-        data = my_class(pk=42, A=10, C=30)
-        await adapter.insert(common_cursor, data)
-        assert adapter.last_query == (
-            "INSERT INTO !a_table! (!A!,!pk!) VALUES (>10<,>42<)"
-        )
-
-    asyncio.run(_test())
 
-
-def test_insert_without_pk(common_cursor, adapter, my_class):
+async def test_insert_without_pk(common_cursor, adapter, my_class):
     """test the insert method without primary key"""
+    common_cursor.primary_key_ = FAKE_PK
+    data = my_class(A=10)
+    await adapter.insert(common_cursor, data)
+    assert adapter.last_query == ("INSERT INTO !a_table! (!A!) VALUES (%s)")
+    common_cursor.insert_auto_pk.assert_called_with(adapter.last_query, "pk", (10,))
+    assert data.pk == FAKE_PK
 
-    async def _test():
-        common_cursor.primary_key_ = key = random.randint(100, 1000)
-        data = my_class(A=10)
-        await adapter.insert(common_cursor, data)
-        assert adapter.last_query == ("INSERT INTO !a_table! (!A!) VALUES (>10<)")
-        assert data.pk == key
-
-    asyncio.run(_test())
 
-
-def test_save_with_pk(common_cursor, adapter, my_class):
+async def test_save_with_pk(common_cursor, adapter, my_class):
     """test the save method with primary key"""
+    data = my_class(pk=42, A=10)
+    await adapter.save(common_cursor, data)
+    assert adapter.last_query == ("UPDATE !a_table! SET !A!=%s WHERE !pk!=%s")
 
-    async def _test():
-        data = my_class(pk=42, A=10)
-        await adapter.save(common_cursor, data)
-        assert adapter.last_query == ("UPDATE !a_table! SET !A!=>10< WHERE !pk!=>42<")
-
-    asyncio.run(_test())
 
-
-def test_save_without_pk(common_cursor, adapter, my_class):
+async def test_save_without_pk(common_cursor, adapter, my_class):
     """test the save method without primary key"""
-
-    async def _test():
-        common_cursor.primary_key_ = key = random.randint(100, 1000)
-        data = my_class(A=10, C=10)
-        await adapter.save(common_cursor, data)
-        assert adapter.last_query == ("INSERT INTO !a_table! (!A!) VALUES (>10<)")
-        assert data.pk == key
-
-    asyncio.run(_test())
-
-
-def test_load(common_cursor, adapter):
+    common_cursor.primary_key_ = FAKE_PK
+    data = my_class(A=10, C=10)
+    await adapter.save(common_cursor, data)
+    assert adapter.last_query == ("INSERT INTO !a_table! (!A!) VALUES (%s)")
+    assert data.pk == FAKE_PK
+
+
+async def test_save_many(common_cursor, pool_connector, adapter, my_class):
+    """test the save_many method"""
+    pool = await pool_connector.create_pool(max_size=1)
+    data = [my_class(pk=42, A=10), my_class(A=20)]
+    results = await adapter.save_many(pool, data)
+    assert len(results) == 2
+    common_cursor.execute.assert_any_call(
+        "UPDATE !a_table! SET !A!=%s WHERE !pk!=%s", (10, 42)
+    )
+    common_cursor.insert_auto_pk.assert_called_with(
+        "INSERT INTO !a_table! (!A!) VALUES (%s)", "pk", (20,)
+    )
+    assert data[1].pk == common_cursor.primary_key_
+    assert pool.idle.qsize() == 1
+
+
+async def test_insert_many(common_cursor, adapter, my_class):
+    """test the insert_many method"""
+    common_cursor.rowcount = 2
+    common_cursor.primary_key_ = FAKE_PK
+    data = [my_class(A=10), my_class(A=20, C=30)]
+    await adapter.insert_many(common_cursor, data)
+    assert adapter.last_query == ("INSERT INTO !a_table! (!A!) VALUES (>10<),(>20<)")
+    assert [item.pk for item in data] == [FAKE_PK, FAKE_PK + 1]
+
+
+async def test_insert_many_mixed_pk(common_cursor, adapter, my_class):
+    """test that insert_many does not replace a primary key an object has"""
+    adapter.before_save = mock.AsyncMock(wraps=adapter.before_save)
+    data = [my_class(A=1), my_class(pk=42, A=2)]
+    with pytest.raises(ValueError):
+        await adapter.insert_many(common_cursor, data)
+    assert not hasattr(data[0], "pk")
+    assert data[1].pk == 42
+    adapter.before_save.assert_not_called()
+
+
+async def test_save_list(common_cursor, adapter, my_class):
+    """test the save method with a list of objects"""
+    common_cursor.rowcount = 2
+    common_cursor.primary_key_ = FAKE_PK
+    data = [my_class(A=10), my_class(pk=42, A=20), my_class(A=30)]
+    result = await adapter.save(common_cursor, data)
+    assert result.last_query == "INSERT INTO !a_table! (!A!) VALUES (>10<),(>30<)"
+    assert result.last_ids == [FAKE_PK, FAKE_PK + 1]
+    assert adapter.last_query == result.last_query
+    assert adapter.last_ids == result.last_ids
+    common_cursor.execute.assert_any_call(
+        "UPDATE !a_table! SET !A!=%s WHERE !pk!=%s", (20, 42)
+    )
+    assert data[0].pk == FAKE_PK
+    assert data[2].pk == FAKE_PK + 1
+
+
+async def test_save_list_columns(common_cursor, adapter, my_class):
+    """test that save inserts objects with different columns separately"""
+    common_cursor.rowcount = 1
+    common_cursor.primary_key_ = FAKE_PK
+    data = [my_class(A=1), my_class(B=5)]
+    result = await adapter.save(common_cursor, data)
+    assert result.last_ids == [FAKE_PK, FAKE_PK]
+    assert common_cursor.insert_many_auto_pk.call_args_list == [
+        mock.call("INSERT INTO !a_table! (!A!) VALUES (>1<)", "pk"),
+        mock.call("INSERT INTO !a_table! (!B!) VALUES (>5<)", "pk"),
+    ]
+    assert [item.pk for item in data] == [FAKE_PK, FAKE_PK]
+
+
+async def test_load(common_cursor, adapter):
     """test the load method"""
-
-    async def _test():
-        common_cursor.description = [["A"], ["B"]]
-        common_cursor.fetchall.return_value = [[1, 2]]
-        data = await adapter.load(common_cursor, 0)
-        assert data.A == 1
-        assert data.B == 2
-
-    asyncio.run(_test())
+    common_cursor.description = [["A"], ["B"]]
+    common_cursor.fetchall.return_value = [[1, 2]]
+    data = await adapter.load(common_cursor, 0)
+    assert data.A == 1
+    assert data.B == 2
 
 
-def test_query(common_cursor, adapter):
+async def test_query(common_cursor, adapter):
     """test the query method"""
-
-    async def _test():
-        common_cursor.description = [["A"], ["B"]]
-        common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
-        data = await adapter.query(common_cursor)
-        assert len(data) == 2
-        data1 = data[0]
-        assert data1.A == 1
-        assert data1.B == 2
-        data2 = data[1]
-        assert data2.A == 3
-        assert data2.B == 4
-
-    asyncio.run(_test())
-
-
-def test_delete_with_pk(common_cursor, adapter):
+    common_cursor.description = [["A"], ["B"]]
+    common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
+    data = await adapter.query(common_cursor)
+    assert len(data) == 2
+    data1 = data[0]
+    assert data1.A == 1
+    assert data1.B == 2
+    data2 = data[1]
+    assert data2.A == 3
+    assert data2.B == 4
+
+
+async def test_query_after_load_many(common_cursor, adapter):
+    """test that query calls after_load_many once"""
+    adapter.after_load_many = mock.AsyncMock(wraps=adapter.after_load_many)
+    adapter.after_load = mock.AsyncMock(wraps=adapter.after_load)
+    common_cursor.description = [["A"], ["B"]]
+    common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
+    data = await adapter.query(common_cursor)
+    assert [item.A for item in data] == [1, 3]
+    adapter.after_load_many.assert_called_once()
+    assert adapter.after_load.call_count == 2
+
+
+async def test_identity_map(common_cursor, adapter):
+    """test that identity_map returns the same instance for a primary key"""
+    common_cursor.description = [["pk"], ["A"]]
+    common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
+    data = await adapter.query(common_cursor)
+    again = await adapter.query(common_cursor)
+    assert data[0] is not again[0]
+
+    adapter.identity_map = True
+    data = await adapter.query(common_cursor)
+    common_cursor.fetchall.return_value = [[1, 20]]
+    item = await adapter.load(common_cursor, 1)
+    assert item is data[0]
+    assert item.A == 20
+    assert data[1].A == 4
+
+    # a column that is now NULL is not left over from the earlier load
+    common_cursor.fetchall.return_value = [[3, None]]
+    item = await adapter.load(common_cursor, 3)
+    assert item is data[1]
+    assert not hasattr(item, "A")
+
+
+async def test_delete_with_pk(common_cursor, adapter):
     """test the delete method with primary key"""
-
-    async def _test():
-        key = random.randint(100, 1000)
-        await adapter.delete(common_cursor, pk=key)
-        assert adapter.last_query == f"DELETE FROM !a_table! WHERE !pk!=>{key}<"
-
-        with pytest.raises(TypeError):
-            await adapter.delete(common_cursor, pk=100, condition="abc")
-
-        with pytest.raises(TypeError):
-            await adapter.delete(common_cursor, "asdf", pk=100)
-
-    asyncio.run(_test())
+    await adapter.delete(common_cursor, pk=FAKE_PK)
+    assert adapter.last_query == f"DELETE FROM !a_table! WHERE !pk!=>{FAKE_PK}<"
 
 
-def test_delete_with_condition(common_cursor, adapter):
+async def test_delete_with_condition(common_cursor, adapter):
     """test the delete method"""
+    await adapter.delete(common_cursor, condition="xyz=%s", args=FAKE_PK)
+    assert adapter.last_query == f"DELETE FROM !a_table! WHERE xyz=>{FAKE_PK}<"
 
-    async def _test():
-        key = random.randint(100, 1000)
-        await adapter.delete(common_cursor, condition="xyz=%s", args=key)
-        assert adapter.last_query == f"DELETE FROM !a_table! WHERE xyz=>{key}<"
 
-        with pytest.raises(TypeError):
-            await adapter.delete(common_cursor, 1000)
-
-    asyncio.run(_test())
-
-
-def test_delete_with_object(common_cursor, adapter, my_class):
+async def test_delete_with_object(common_cursor, adapter, my_class):
     """test the delete method"""
-
-    async def _test():
-        data = my_class(pk=42, A=10)
-        await adapter.delete(common_cursor, data)
-        assert adapter.last_query == "DELETE FROM !a_table! WHERE !pk!=>42<"
-
-        with pytest.raises(TypeError):
-            await adapter.delete(common_cursor, data, pk=100)
-
-        with pytest.raises(TypeError):
-            await adapter.delete(common_cursor, data, args=100)
-
-    asyncio.run(_test())
+    data = my_class(pk=42, A=10)
+    await adapter.delete(common_cursor, data)
+    assert adapter.last_query == "DELETE FROM !a_table! WHERE !pk!=>42<"
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    (
+        ({"pk": 100, "condition": "abc"}, "pk is not compatible with condition"),
+        ({"pk": 100, "args": 10}, "pk is not compatible with args"),
+        ({"condition": 1000}, "expecting condition to be a str"),
+        (
+            {"condition": types.SimpleNamespace(pk=42), "pk": 100},
+            "pk is not compatible with condition",
+        ),
+        (
+            {"condition": types.SimpleNamespace(pk=42), "args": 100},
+            "object is not compatible with args",
+        ),
+        ({}, "no arguments specified"),
+    ),
+)
+def test_delete_validation(adapter, kwargs, message):
+    """test that incompatible delete arguments are rejected"""
+    adapter.pk = "pk"
+    with pytest.raises(TypeError, match=message):
+        adapter._validate_delete_args(**kwargs)  # pylint: disable=protected-access
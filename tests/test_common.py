@@ -1,50 +1,168 @@
 """test common cursor methods"""
 
-import asyncio
 from unittest import mock
 
+import pytest
 
-def test_ping(common_cursor):
-    """test the ping method"""
+from tablemap.connection import common
 
-    async def _test():
-        common_cursor.fetchone = mock.AsyncMock(return_value=(1,))
-        await common_cursor.ping()
-        common_cursor.execute.assert_called_with("SELECT 1")
 
-    asyncio.run(_test())
+async def test_ping(common_cursor, async_return):
+    """test the ping method"""
+    common_cursor.fetchone = async_return((1,))
+    await common_cursor.ping()
+    common_cursor.execute.assert_called_with("SELECT 1")
 
 
-def test_commit(common_cursor):
+async def test_commit(common_cursor):
     """test the commit method"""
+    await common_cursor.commit()
+    common_cursor.execute.assert_called_with("COMMIT")
 
-    async def _test():
-        await common_cursor.commit()
-        common_cursor.execute.assert_called_with("COMMIT")
-
-    asyncio.run(_test())
 
-
-def test_rollback(common_cursor):
+async def test_rollback(common_cursor):
     """test the rollback method"""
+    await common_cursor.rollback()
+    common_cursor.execute.assert_called_with("ROLLBACK")
+
 
-    async def _test():
-        await common_cursor.rollback()
-        common_cursor.execute.assert_called_with("ROLLBACK")
+async def test_close(common_cursor):
+    """test the close method with sync and async underlying cursors"""
+    common_cursor.cursor_ = mock.Mock()
+    await common_cursor.close()
+    common_cursor.cursor_.close.assert_called_once()
 
-    asyncio.run(_test())
+    common_cursor.cursor_ = mock.AsyncMock()
+    await common_cursor.close()
+    common_cursor.cursor_.close.assert_awaited_once()
 
 
-def test_select(common_cursor):
+async def test_select(common_cursor, async_return):
     """test the select method"""
+    # columns and rows
+    common_cursor.description = (("A",), ("B",))
+    common_cursor.fetchall = async_return(((1, 2), (3, 4)))
+
+    result = await common_cursor.select(stmt := "test select statement")
+    assert result == [{"A": 1, "B": 2}, {"A": 3, "B": 4}]
+    common_cursor.execute.assert_called_with(stmt)
+
+
+@pytest.mark.parametrize(
+    "value, result",
+    (
+        (None, "NULL"),
+        (10, "'10'"),
+        ("abc", "'abc'"),
+        ("a'b'c", "'a>'b>'c'"),
+    ),
+)
+def test_escape(value, result):
+    """test the escape function"""
+    assert common.escape(value, "'", ">'") == result
+
+
+async def test_pool(common_cursor, pool_connector):
+    """test acquire and release of a pooled cursor"""
+    pool = await pool_connector.create_pool(max_size=1)
+    assert pool.size == 1
+    async with pool.acquire() as con:
+        assert con is common_cursor
+        assert pool.idle.empty()
+    common_cursor.execute.assert_called_with("COMMIT")
+    assert mock.call("ROLLBACK") not in common_cursor.execute.call_args_list
+    assert pool.idle.qsize() == 1
+    assert pool.size == 1
+
+
+async def test_pool_manual_release(common_cursor, pool_connector):
+    """test that a manually released cursor is rolled back before re-use"""
+    pool = await pool_connector.create_pool(max_size=1)
+    con = await pool.acquire()
+    common_cursor.execute.reset_mock()
+    await con.execute("INSERT INTO uncommitted")
+    await pool.release(con)
+    assert common_cursor.execute.call_args_list == [
+        mock.call("INSERT INTO uncommitted"),
+        mock.call("ROLLBACK"),
+    ]
+    assert pool.idle.qsize() == 1
+    assert pool.size == 1
+
+
+async def test_pool_discard(common_cursor, pool_connector):
+    """test that a failed block discards the cursor"""
+    common_cursor.close = mock.AsyncMock()
+    pool = await pool_connector.create_pool(max_size=1)
+    common_cursor.cursor_ = connection_cursor = mock.Mock()
+    with pytest.raises(ValueError):
+        async with pool.acquire():
+            raise ValueError()
+    common_cursor.execute.assert_called_with("ROLLBACK")
+    common_cursor.close.assert_called_once()
+    connection_cursor.connection.close.assert_called_once()
+    assert pool.size == 0
+    assert pool.idle.empty()
+
+    # the pool replaces the discarded cursor
+    con = await pool.acquire()
+    assert con is common_cursor
+    assert pool.size == 1
+    await pool.release(con)
+
+
+async def test_pool_ping(common_cursor, pool_connector, async_return):
+    """test that an idle cursor is pinged before re-use"""
+    common_cursor.fetchone = async_return((1,))
+    pool = await pool_connector.create_pool(idle_timeout=0)
+    async with pool.acquire():
+        common_cursor.execute.assert_called_with("SELECT 1")
+
+
+async def test_select_as(common_cursor, async_return):
+    """test the select_as method"""
+    common_cursor.description = (("A",), ("COUNT(*)",))
+    common_cursor.fetchall = async_return(((1, 2), (3, 4)))
+
+    result = await common_cursor.select_as("test select statement")
+    assert result == [(1, 2), (3, 4)]
+    assert result[1].A == 3
+    assert isinstance(result[0], common.row_type(("A", "COUNT(*)")))
+
+    result = await common_cursor.select_as("test select statement", complex)
+    assert result == [1 + 2j, 3 + 4j]
+
+
+async def test_cache_columns(common_cursor, monkeypatch):
+    """test the cache_columns decorator and invalidate_schema"""
+    monkeypatch.setattr(common, "_SCHEMA_CACHE", {})
+
+    calls = []
+
+    @common.cache_columns
+    async def columns(con, tablename):  # pylint: disable=unused-argument
+        calls.append(tablename)
+        if tablename == "missing":
+            return None, []
+        return "pk", ["A", "B"]
+
+    # no db_key, no caching
+    await columns(common_cursor, "table_1")
+    await columns(common_cursor, "table_1")
+    assert calls == ["table_1", "table_1"]
 
-    async def _test():
-        # columns and rows
-        common_cursor.description = (("A",), ("B",))
-        common_cursor.fetchall = mock.AsyncMock(return_value=((1, 2), (3, 4)))
+    calls.clear()
+    common_cursor.db_key_ = "test_cache_columns"
+    assert await columns(common_cursor, "table_1") == ("pk", ["A", "B"])
+    assert await columns(common_cursor, "table_1") == ("pk", ["A", "B"])
+    assert calls == ["table_1"]
 
-        result = await common_cursor.select(stmt := "test select statement")
-        assert result == [{"A": 1, "B": 2}, {"A": 3, "B": 4}]
-        common_cursor.execute.assert_called_with(stmt)
+    common_cursor.invalidate_schema("table_1")
+    await columns(common_cursor, "table_1")
+    assert calls == ["table_1", "table_1"]
 
-    asyncio.run(_test())
+    # a table without columns is not cached
+    calls.clear()
+    assert await columns(common_cursor, "missing") == (None, [])
+    await columns(common_cursor, "missing")
+    assert calls == ["missing", "missing"]
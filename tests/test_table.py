@@ -1,221 +1,308 @@
 """test table operations"""
 
-import asyncio
-import random
+from unittest import mock
+
+import pytest
 
 import tablemap
 
+FAKE_PK = 777  # an arbitrary primary key value
 
-def test_setup(common_cursor, table):
-    """test the setup method"""
 
-    async def _test():
-        assert table.is_init is False
-        await table.setup(common_cursor)
-        assert table.is_init is True
-        assert table.pk == common_cursor.primary_key_column_
-        assert table.fields == common_cursor.columns_
-        assert table.query_fields == "!pk!,!A!,!B!"
+class _CalcTable(tablemap.Table):
+    """test table class with Calculated class fields"""
 
-    asyncio.run(_test())
+    table_name = "the_table"
 
+    now = tablemap.Calculated("NOW()")
+    another_field = tablemap.Calculated("10 + 10")
 
-def test_update(common_cursor, table):
-    """test the update method"""
 
-    async def _test():
-        row_count = await table.update(common_cursor, {"pk": 42, "A": 10})
-        assert row_count == table.row_count
-        assert table.last_query == "UPDATE !test_table! SET !A!=>10< WHERE !pk!=>42<"
-
-    asyncio.run(_test())
+async def test_setup(cursor_stub, table):
+    """test the setup method"""
+    assert table.is_init is False
+    await table.setup(cursor_stub)
+    assert table.is_init is True
+    assert table.pk == "pk"
+    assert table.fields == ["A", "B"]
+    assert table.query_fields == "!pk!,!A!,!B!"
+
+
+async def test_setup_again(common_cursor, table):
+    """test that cached statements are rebuilt when setup runs again"""
+    await table.insert(common_cursor, {"A": 10})
+    await table.update(common_cursor, {"pk": 42, "A": 10})
+    await table.insert_many(common_cursor, [{"A": 10}, {"A": 20}])
+    table.table_name, table.is_init = "other_table", False
+    await table.insert(common_cursor, {"A": 10})
+    assert table.last_query == "INSERT INTO !other_table! (!A!) VALUES (%s)"
+    await table.update(common_cursor, {"pk": 42, "A": 10})
+    assert table.last_query == "UPDATE !other_table! SET !A!=%s WHERE !pk!=%s"
+    await table.insert_many(common_cursor, [{"A": 10}, {"A": 20}])
+    assert table.last_query == ("INSERT INTO !other_table! (!A!) VALUES (>10<),(>20<)")
+
+
+async def test_update(common_cursor, table):
+    """test the update method"""
+    row_count = await table.update(common_cursor, {"pk": 42, "A": 10})
+    assert row_count == table.row_count
+    assert table.last_query == "UPDATE !test_table! SET !A!=%s WHERE !pk!=%s"
+    common_cursor.execute.assert_called_with(table.last_query, (10, 42))
 
 
-def test_update_with_raw(common_cursor, table):
+async def test_update_with_raw(common_cursor, table):
     """test the update method with raw column"""
-
-    async def _test():
-        await table.update(
-            common_cursor,
-            data={"pk": 42, "A": 10},
-            raw={"time": "NOW()"},
-        )
-        assert table.last_query == (
-            "UPDATE !test_table! SET !A!=>10<,!time!=NOW() WHERE !pk!=>42<"
-        )
-
-    asyncio.run(_test())
-
-
-def test_insert_with_pk(common_cursor, table):
-    """test the insert method with primary key present"""
-
-    async def _test():
-        await table.insert(common_cursor, {"pk": 42, "A": 10})
-        assert table.last_query == (
-            "INSERT INTO !test_table! (!A!,!pk!) VALUES (>10<,>42<)"
-        )
+    await table.update(
+        common_cursor,
+        data={"pk": 42, "A": 10},
+        raw={"time": "NOW()"},
+    )
+    assert table.last_query == (
+        "UPDATE !test_table! SET !A!=>10<,!time!=NOW() WHERE !pk!=>42<"
+    )
+
+
+@pytest.mark.parametrize(
+    "data, raw, expected_sql, params, auto_pk",
+    (
+        (
+            {"pk": 42, "A": 10},
+            None,
+            "INSERT INTO !test_table! (!A!,!pk!) VALUES (%s,%s)",
+            (10, 42),
+            False,
+        ),
+        (
+            {"A": 10},
+            None,
+            "INSERT INTO !test_table! (!A!) VALUES (%s)",
+            (10,),
+            True,
+        ),
+        (
+            {"pk": 42, "A": 10},
+            {"time": "NOW()"},
+            "INSERT INTO !test_table! (!A!,!pk!,!time!) VALUES (>10<,>42<,NOW())",
+            None,
+            False,
+        ),
+        (
+            {"A": 10},
+            {"time": "NOW()"},
+            "INSERT INTO !test_table! (!A!,!time!) VALUES (>10<,NOW())",
+            None,
+            True,
+        ),
+    ),
+    ids=("with_pk", "without_pk", "with_pk_with_raw", "without_pk_with_raw"),
+)
+# pylint: disable-next=too-many-arguments,too-many-positional-arguments
+async def test_insert(common_cursor, table, data, raw, expected_sql, params, auto_pk):
+    """test the insert method with and without primary key and raw columns"""
+    common_cursor.primary_key_ = FAKE_PK
+    await table.insert(common_cursor, data, raw)
+    assert table.last_query == expected_sql
+    if auto_pk:
+        common_cursor.insert_auto_pk.assert_called_once_with(expected_sql, "pk", params)
+        assert table.last_id == FAKE_PK
+    else:
+        common_cursor.execute.assert_called_with(expected_sql, params)
         common_cursor.insert_auto_pk.assert_not_called()
-
-    asyncio.run(_test())
-
-
-def test_insert_without_pk(common_cursor, table):
-    """test the insert method with primary key absent"""
-
-    async def _test():
-        common_cursor.primary_key_ = random.randint(100, 1000)
-        table.last_id = None
-        await table.insert(common_cursor, {"A": 10})
-        assert table.last_query == ("INSERT INTO !test_table! (!A!) VALUES (>10<)")
-        common_cursor.insert_auto_pk.assert_called_once()
-        assert table.last_id == common_cursor.primary_key_
-
-    asyncio.run(_test())
-
-
-def test_insert_with_pk_with_raw(common_cursor, table):
-    """test the insert method with primary key and raw column"""
-
-    async def _test():
-        await table.insert(
-            common_cursor,
-            data={"pk": 42, "A": 10},
-            raw={"time": "NOW()"},
-        )
-        assert table.last_query == (
-            "INSERT INTO !test_table! (!A!,!pk!,!time!) VALUES (>10<,>42<,NOW())"
-        )
-
-    asyncio.run(_test())
-
-
-def test_insert_without_pk_with_raw(common_cursor, table):
-    """test the insert method without primary key with raw column"""
-
-    async def _test():
-        common_cursor.insert_auto_pk.reset_mock()
-        await table.insert(
-            common_cursor,
-            data={"A": 10},
-            raw={"time": "NOW()"},
-        )
-        assert table.last_query == (
-            "INSERT INTO !test_table! (!A!,!time!) VALUES (>10<,NOW())"
-        )
-        common_cursor.insert_auto_pk.assert_called_once()
-
-    asyncio.run(_test())
-
-
-def test_save_with_pk(common_cursor, table):
-    """test the save method with primary key present"""
-
-    async def _test():
-        table.update.reset_mock()
-        await table.save(common_cursor, {"pk": 42, "A": 10})
-        table.update.assert_called_once()
-
-    asyncio.run(_test())
-
-
-def test_save_with_pk_with_raw(common_cursor, table):
-    """test the save method with primary key present and raw column"""
-
-    async def _test():
-        table.update.reset_mock()
-        args = (common_cursor, {"pk": 42, "A": 10}, {"time": "NOW()"})
-        await table.save(*args)
-        table.update.assert_called_once_with(*args)
-
-    asyncio.run(_test())
-
-
-def test_save_without_pk(common_cursor, table):
-    """test the save method with primary key absent"""
-
-    async def _test():
-        table.insert.reset_mock()
-        await table.save(common_cursor, {"A": 10})
-        table.insert.assert_called_once()
-
-    asyncio.run(_test())
-
-
-def test_save_without_pk_with_raw(common_cursor, table):
-    """test the save method with primary key absent and raw column"""
-
-    async def _test():
-        table.insert.reset_mock()
-        args = (common_cursor, {"A": 10}, {"time": "NOW()"})
-        await table.save(*args)
-        table.insert.assert_called_once_with(*args)
-
-    asyncio.run(_test())
-
-
-def test_delete(common_cursor, table):
+        assert table.last_id is None
+
+
+async def test_insert_result(common_cursor, table):
+    """test the Result returned by the insert method"""
+    common_cursor.primary_key_ = FAKE_PK
+    result = await table.insert(common_cursor, {"A": 10})
+    assert isinstance(result, tablemap.Result)
+    assert result == result.row_count == common_cursor.rowcount
+    assert result.last_id == FAKE_PK
+    assert result.last_ids is None
+    assert result.last_query == "INSERT INTO !test_table! (!A!) VALUES (%s)"
+
+    result = await table.insert(common_cursor, {"C": 10})
+    assert result == 0
+    assert result.last_query is None
+
+
+async def test_insert_many_with_pk(common_cursor, table):
+    """test the insert_many method with primary key present"""
+    common_cursor.rowcount = 2
+    rows = [{"pk": 42, "A": 10}, {"pk": 43, "A": 20}]
+    row_count = await table.insert_many(common_cursor, rows)
+    assert row_count == 2
+    assert table.last_query == (
+        "INSERT INTO !test_table! (!A!,!pk!) VALUES (>10<,>42<),(>20<,>43<)"
+    )
+    common_cursor.insert_many_auto_pk.assert_not_called()
+
+
+async def test_insert_many_without_pk_with_raw(common_cursor, table):
+    """test the insert_many method with primary key absent and raw column"""
+    common_cursor.rowcount = 2
+    common_cursor.primary_key_ = FAKE_PK
+    rows = [{"A": 10}, {"A": 20}]
+    await table.insert_many(common_cursor, rows, raw={"time": "NOW()"})
+    assert table.last_query == (
+        "INSERT INTO !test_table! (!A!,!time!) VALUES (>10<,NOW()),(>20<,NOW())"
+    )
+    common_cursor.insert_many_auto_pk.assert_called_once()
+    assert table.last_ids == [FAKE_PK, FAKE_PK + 1]
+    assert table.last_id == FAKE_PK
+
+
+@pytest.mark.parametrize(
+    "rows",
+    (
+        [{"A": 10}, {"pk": 42, "A": 20}],
+        [{"pk": 42, "A": 10}, {"A": 20}],
+        [{"A": 10}, {"B": 20}],
+        [{"A": 10}, {"A": 20, "B": 30}],
+    ),
+)
+@pytest.mark.parametrize("method", ("insert_many", "copy_in"))
+async def test_insert_many_mismatched_columns(common_cursor, table, method, rows):
+    """test that insert_many and copy_in reject rows with different columns"""
+    with pytest.raises(ValueError):
+        await getattr(table, method)(common_cursor, rows)
+    common_cursor.execute.assert_not_called()
+
+
+async def test_insert_many_with_raw_pk(common_cursor, table):
+    """test insert_many with the primary key supplied as a raw column"""
+    await table.insert_many(
+        common_cursor, [{"pk": 1, "A": 10}, {"pk": 2, "A": 20}], raw={"pk": "UUID()"}
+    )
+    assert table.last_query == (
+        "INSERT INTO !test_table! (!A!,!pk!) VALUES (>10<,UUID()),(>20<,UUID())"
+    )
+    common_cursor.insert_many_auto_pk.assert_not_called()
+
+
+async def test_copy_in(common_cursor, table):
+    """test the copy_in method"""
+    common_cursor.copy_chunk_size = 2
+    rows = [{"pk": 42, "A": 10}, {"pk": 43, "A": 20}, {"pk": 44, "A": 30}]
+    row_count = await table.copy_in(common_cursor, rows)
+    assert row_count == 2  # common_cursor.rowcount per chunk
+    assert common_cursor.execute.call_args_list == [
+        mock.call(
+            "INSERT INTO !test_table! (!A!,!pk!) VALUES (%s,%s),(%s,%s)",
+            [10, 42, 20, 43],
+        ),
+        mock.call("INSERT INTO !test_table! (!A!,!pk!) VALUES (%s,%s)", [30, 44]),
+    ]
+
+
+async def test_insert_many_copy_in(common_cursor, table):
+    """test that a large insert_many with primary keys uses copy_in"""
+    table.copy_threshold = 1
+    table.copy_in = mock.AsyncMock(wraps=table.copy_in)
+    rows = [{"pk": 42, "A": 10}, {"pk": 43, "A": 20}]
+    await table.insert_many(common_cursor, rows)
+    (call,) = table.copy_in.call_args_list
+    assert call.args == (common_cursor, rows)
+
+    table.copy_in.reset_mock()
+    await table.insert_many(common_cursor, [{"A": 10}, {"A": 20}])
+    table.copy_in.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "data, raw, method",
+    (
+        ({"pk": 42, "A": 10}, None, "update"),
+        ({"pk": 42, "A": 10}, {"time": "NOW()"}, "update"),
+        ({"A": 10}, None, "insert"),
+        ({"A": 10}, {"time": "NOW()"}, "insert"),
+    ),
+    ids=("with_pk", "with_pk_with_raw", "without_pk", "without_pk_with_raw"),
+)
+async def test_save(common_cursor, table_tracked_save, data, raw, method):
+    """test that save updates with primary key present, else inserts"""
+    table = table_tracked_save
+    await table.save(common_cursor, data, raw)
+    (call,) = getattr(table, method).call_args_list
+    assert call.args == (common_cursor, data, raw)
+
+
+async def test_delete(common_cursor, table):
     """test the delete method"""
-
-    async def _test():
-        await table.delete(common_cursor, "xyz=%s", arg := random.randint(100, 1000))
-        assert table.last_query == f"DELETE FROM !test_table! WHERE xyz=>{arg}<"
-
-    asyncio.run(_test())
+    await table.delete(common_cursor, "xyz=%s", FAKE_PK)
+    assert table.last_query == f"DELETE FROM !test_table! WHERE xyz=>{FAKE_PK}<"
 
 
-def test_load(common_cursor, table):
+async def test_load(common_cursor, table):
     """test the load method"""
-
-    async def _test():
-        common_cursor.description = [["A"], ["B"]]
-        common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
-        rs = await table.load(common_cursor, key := random.randint(100, 1000))
-        assert table.last_query == (
-            f"SELECT !pk!,!A!,!B! FROM !test_table! WHERE !pk!=>{key}< LIMIT 1"
-        )
-        assert rs == {"A": 1, "B": 2}
-
-    asyncio.run(_test())
+    common_cursor.description = [["A"], ["B"]]
+    common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
+    rs = await table.load(common_cursor, FAKE_PK)
+    assert table.last_query == (
+        f"SELECT !pk!,!A!,!B! FROM !test_table! WHERE !pk!=>{FAKE_PK}< LIMIT 1"
+    )
+    assert rs == {"A": 1, "B": 2}
 
 
-def test_query(common_cursor, table):
+async def test_query(common_cursor, table):
     """test the query method"""
-
-    async def _test():
-        common_cursor.description = [["A"], ["B"]]
-        common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
-        rs = await table.query(common_cursor)
-        assert table.last_query == "SELECT !pk!,!A!,!B! FROM !test_table! WHERE 1=1"
-        assert rs == [{"A": 1, "B": 2}, {"A": 3, "B": 4}]
-
-    asyncio.run(_test())
-
-
-def test_calculated(common_cursor):
+    common_cursor.description = [["A"], ["B"]]
+    common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
+    rs = await table.query(common_cursor)
+    assert table.last_query == "SELECT !pk!,!A!,!B! FROM !test_table! WHERE 1=1"
+    assert rs == [{"A": 1, "B": 2}, {"A": 3, "B": 4}]
+
+
+async def test_load_many(common_cursor, table):
+    """test the load_many method"""
+    assert await table.load_many(common_cursor, []) == []
+    common_cursor.execute.assert_not_called()
+
+    common_cursor.description = [["pk"], ["A"]]
+    common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
+    rs = await table.load_many(common_cursor, (1, 3))
+    assert table.last_query == (
+        "SELECT !pk!,!A!,!B! FROM !test_table! WHERE !pk! IN (>1<,>3<)"
+    )
+    assert rs == [{"pk": 1, "A": 2}, {"pk": 3, "A": 4}]
+
+
+async def test_query_rows(common_cursor, table):
+    """test the query_rows method"""
+    common_cursor.description = [["A"], ["B"]]
+    common_cursor.fetchall.return_value = [[1, 2], [3, 4]]
+    rs = await table.query_rows(common_cursor, limit=2)
+    assert table.last_query == (
+        "SELECT !pk!,!A!,!B! FROM !test_table! WHERE 1=1 LIMIT 2"
+    )
+    assert rs == [(1, 2), (3, 4)]
+    assert rs[1].B == 4
+
+
+async def test_query_with_args(common_cursor, table):
+    """test the query method with a list of args"""
+    common_cursor.description = []
+    common_cursor.fetchall.return_value = []
+    await table.query(common_cursor, "A=%s AND B=%s", [1, 2])
+    assert table.last_query == (
+        "SELECT !pk!,!A!,!B! FROM !test_table! WHERE A=>1< AND B=>2<"
+    )
+
+
+async def test_calculated(common_cursor):
     """test the Calculated field mechanism"""
+    assert list(_CalcTable.calculated) == ["another_field", "now"]
 
-    class CalcTable(tablemap.Table):
-        """test table class with Calculated class fields"""
-
-        table_name = "the_table"
+    common_cursor.description = []
+    common_cursor.fetchall.return_value = []
+    await _CalcTable.query(common_cursor)
+    assert _CalcTable.last_query == (
+        "SELECT !pk!,!A!,!B!,10 + 10 AS !another_field!,NOW() AS !now!"
+        " FROM !the_table! WHERE 1=1"
+    )
 
-        now = tablemap.Calculated("NOW()")
-        another_field = tablemap.Calculated("10 + 10")
 
-    async def _test():
-        common_cursor.description = []
-        common_cursor.fetchall.return_value = []
-        await CalcTable.query(common_cursor)
-        assert CalcTable.last_query == (
-            "SELECT !pk!,!A!,!B!,10 + 10 AS !another_field!,NOW() AS !now!"
-            " FROM !the_table! WHERE 1=1"
-        )
-
-    asyncio.run(_test())
-
-
-def test_special_handling(common_cursor):
+async def test_special_handling(common_cursor):
     """test the SpecialHandling field mechanism"""
 
     def my_save(con, value):
@@ -234,18 +321,15 @@ def test_special_handling(common_cursor):
             save_fn=my_save,
         )
 
-    async def _test():
-        common_cursor.description = []
-        common_cursor.fetchall.return_value = []
-        await SpecialTable.insert(common_cursor, data={"A": 10, "B": 20})
-        assert SpecialTable.last_query == (
-            "INSERT INTO !the_table! (!A!,!B!) VALUES (Special(>01<),>20<)"
-        )
-
-        await SpecialTable.load(common_cursor, 100)
-        assert SpecialTable.last_query == (
-            "SELECT !pk!,SpecialRead(!A!) AS !A!,!B! FROM !the_table!"
-            " WHERE !pk!=>100< LIMIT 1"
-        )
-
-    asyncio.run(_test())
+    common_cursor.description = []
+    common_cursor.fetchall.return_value = []
+    await SpecialTable.insert(common_cursor, data={"A": 10, "B": 20})
+    assert SpecialTable.last_query == (
+        "INSERT INTO !the_table! (!A!,!B!) VALUES (Special(>01<),>20<)"
+    )
+
+    await SpecialTable.load(common_cursor, 100)
+    assert SpecialTable.last_query == (
+        "SELECT !pk!,SpecialRead(!A!) AS !A!,!B! FROM !the_table!"
+        " WHERE !pk!=>100< LIMIT 1"
+    )